@@ -0,0 +1,36 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled naive summation kernels, an alternative to the Numba JIT that needs no warm-up.
+Build with `python setup.py build_ext --inplace` in this directory. Both functions behave like
+`summation.naive_sum`: they add `small` to `large` n times, one addition after another, write the
+partial sum after sample_idx[k] additions to out[k] and return the final sum.
+"""
+from libc.stdint cimport int64_t
+
+
+def naive_sum_f32(float large, float small, Py_ssize_t n, const int64_t[::1] sample_idx, float[::1] out):
+    """Single-precision (float32) naive summation."""
+    cdef float acc = large
+    cdef Py_ssize_t i, k = 0
+    cdef Py_ssize_t n_samples = sample_idx.shape[0]
+    with nogil:
+        for i in range(1, n + 1):
+            acc += small
+            if k < n_samples and sample_idx[k] == i:
+                out[k] = acc
+                k += 1
+    return acc
+
+
+def naive_sum_f64(double large, double small, Py_ssize_t n, const int64_t[::1] sample_idx, double[::1] out):
+    """Double-precision (float64) naive summation."""
+    cdef double acc = large
+    cdef Py_ssize_t i, k = 0
+    cdef Py_ssize_t n_samples = sample_idx.shape[0]
+    with nogil:
+        for i in range(1, n + 1):
+            acc += small
+            if k < n_samples and sample_idx[k] == i:
+                out[k] = acc
+                k += 1
+    return acc
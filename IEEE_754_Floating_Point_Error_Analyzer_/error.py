@@ -1,16 +1,127 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 import tkinter as tk
 from tkinter import ttk, messagebox
-import numpy as np
-from decimal import Decimal, getcontext
+from decimal import Decimal, InvalidOperation, getcontext
 
-# For plotting inside Tkinter
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+# NumPy, Matplotlib and the summation kernels (which may pull in Numba) take a noticeable time to
+# import, so they are imported where first needed rather than here, letting the window open quickly
 
-
-# Set the precision for the Decimal type to ensure it's our "ground truth"
+# Set the precision used when the exact results are converted to Decimal for display
 getcontext().prec = 50
 
+# Number of evenly spaced steps at which the error is evaluated. This is dense enough to catch the
+# sawtooth of the rounding error; the curves are then reduced to _PLOT_POINTS points for drawing,
+# since the plot is only a few hundred pixels wide
+_ERROR_SAMPLES = 20000
+_PLOT_POINTS = 2000
+
+# Summation algorithms offered in the GUI, mapped to their kernels in the `summation` module
+_SUM_ALGORITHMS = {
+    "Naive (serial)": "naive_sum",
+    "Pairwise (like np.sum)": "pairwise_sum",
+    "Kahan (compensated)": "kahan_sum",
+}
+
+# Number of recent runs whose results are kept, so rerunning with unchanged inputs is instant
+_RESULT_CACHE_SIZE = 8
+
+# Largest accepted number of additions. A run cannot be cancelled, and even the compiled kernels
+# need minutes for this many; it also keeps the int64 step arithmetic far from overflowing
+_MAX_ITERATIONS = 10**12
+
+
+@dataclass(frozen=True)
+class SimulationParams:
+    """Validated inputs of one analysis run. Frozen, so it can also serve as the result cache key."""
+    large_num_scaled: int  # large number * scale, exactly
+    small_num_scaled: int  # small number * scale, exactly
+    scale: int  # power of ten that makes both numbers integers
+    large_num_float: object  # large number in the chosen NumPy float type
+    small_num_float: object  # small number in the chosen NumPy float type
+    iterations: int
+    dtype: type
+    algorithm: str
+    show_kahan: bool
+
+
+def _parse_scaled(text):
+    """
+    Parses a decimal number string exactly, returning (mantissa, digits) such that the number is
+    mantissa / 10**digits, with as few fractional digits as possible (so "1e7" and "10000000.0" agree).
+    """
+    sign, digit_tuple, exponent = Decimal(text).as_tuple()
+    if not isinstance(exponent, int):
+        raise ValueError(f"{text!r} is not a finite number")
+    mantissa = int("".join(map(str, digit_tuple)))
+    if sign:
+        mantissa = -mantissa
+    if exponent >= 0:
+        return mantissa * 10 ** exponent, 0
+    digits = -exponent
+    while digits and mantissa % 10 == 0:
+        mantissa //= 10
+        digits -= 1
+    return mantissa, digits
+
+
+def _to_decimal(numerator, denominator):
+    """Converts the exact ratio of two integers to a Decimal, rounded to the context precision, for display."""
+    return Decimal(numerator) / Decimal(denominator)
+
+
+def _format_exact(value, spec):
+    """Formats an exact (numerator, denominator) pair with `spec`, or a non-finite float as it is ('inf' or 'nan')."""
+    if isinstance(value, tuple):
+        return format(_to_decimal(*value), spec)
+    return str(value)
+
+
+def _lttb_approx(x, y, n_out):
+    """
+    Downsamples the curve (x, y) to n_out points with a vectorized approximation of
+    largest-triangle-three-buckets, which keeps the spikes that taking every k-th point would skip.
+    """
+    import numpy as np
+
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return x, y
+
+    x_float = x.astype(np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, sizes = edges[:-1], np.diff(edges)
+
+    # Lay the buckets out as the rows of a padded 2D array; the padding never gets picked
+    columns = np.arange(sizes.max())
+    bucket_idx = np.minimum(starts[:, None] + columns, n - 2)
+    padding = columns >= sizes[:, None]
+    bucket_x, bucket_y = x_float[bucket_idx], y[bucket_idx]
+
+    # Average of each bucket, with the first and last points standing in for the buckets beyond either end
+    avg_x = np.concatenate(([x_float[0]], np.add.reduceat(x_float[:n - 1], starts) / sizes, [x_float[-1]]))
+    avg_y = np.concatenate(([y[0]], np.add.reduceat(y[:n - 1], starts) / sizes, [y[-1]]))
+    next_x, next_y = avg_x[2:], avg_y[2:]
+
+    def pick(prev_x, prev_y):
+        # Twice the triangle areas; only their order matters. Non-finite errors make inf or nan areas,
+        # which argmax picks first, so such points are kept rather than raising
+        with np.errstate(over="ignore", invalid="ignore"):
+            areas = np.abs(
+                (prev_x - next_x)[:, None] * (bucket_y - prev_y[:, None])
+                - (prev_x[:, None] - bucket_x) * (next_y - prev_y)[:, None]
+            )
+        areas[padding] = -1.0
+        return starts + np.argmax(areas, axis=1)
+
+    keep = pick(avg_x[:-2], avg_y[:-2])
+    prev = np.concatenate(([0], keep[:-1]))
+    keep = pick(x_float[prev], y[prev])
+    keep = np.concatenate(([0], keep, [n - 1]))
+    return x[keep], y[keep]
+
+
 class FloatingPointErrorAnalyzer(tk.Tk):
     """
     A GUI application to demonstrate and analyze IEEE 754 floating-point rounding errors
@@ -21,6 +132,9 @@ class FloatingPointErrorAnalyzer(tk.Tk):
         self.title("IEEE 754 Floating-Point Error Analyzer")
         self.geometry("900x700")
 
+        # Results of recent runs, keyed by their `SimulationParams` (least recently used first)
+        self._cache = OrderedDict()
+
         # --- Main frame ---
         main_frame = ttk.Frame(self, padding="10")
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -33,7 +147,8 @@ class FloatingPointErrorAnalyzer(tk.Tk):
         # --- Create widgets ---
         self._create_input_widgets(main_frame)
         self._create_results_display(main_frame)
-        self._create_plot(main_frame)
+        # Build the plot once the rest of the window has been drawn, as Matplotlib is slow to import
+        self.after_idle(self._create_plot, main_frame)
         
         # Add a description label
         desc_label = ttk.Label(
@@ -79,9 +194,28 @@ class FloatingPointErrorAnalyzer(tk.Tk):
         )
         precision_menu.grid(row=3, column=1, sticky="ew", pady=2)
 
+        # Summation algorithm
+        ttk.Label(input_frame, text="Summation Algorithm:").grid(row=4, column=0, sticky="w", pady=2)
+        self.sum_algo_var = tk.StringVar(value="Naive (serial)")
+        sum_algo_menu = ttk.Combobox(
+            input_frame,
+            textvariable=self.sum_algo_var,
+            values=list(_SUM_ALGORITHMS),
+            state="readonly"
+        )
+        sum_algo_menu.grid(row=4, column=1, sticky="ew", pady=2)
+
+        # Kahan comparison
+        self.show_kahan_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            input_frame,
+            text="Show Kahan-compensated trace",
+            variable=self.show_kahan_var
+        ).grid(row=5, column=0, columnspan=2, sticky="w", pady=2)
+
         # Run Button
-        run_button = ttk.Button(input_frame, text="Run Analysis", command=self.run_analysis)
-        run_button.grid(row=4, column=0, columnspan=2, pady=10)
+        self.run_button = ttk.Button(input_frame, text="Run Analysis", command=self.run_analysis)
+        self.run_button.grid(row=6, column=0, columnspan=2, pady=10)
 
     def _create_results_display(self, parent):
         """Creates the labels for displaying the calculation results."""
@@ -112,6 +246,10 @@ class FloatingPointErrorAnalyzer(tk.Tk):
 
     def _create_plot(self, parent):
         """Creates the Matplotlib canvas for plotting the error."""
+        # For plotting inside Tkinter
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
         plot_frame = ttk.LabelFrame(parent, text="Error Accumulation Graph", padding="10")
         plot_frame.grid(row=5, column=0, columnspan=2, sticky="nsew", padx=5, pady=5)
         plot_frame.rowconfigure(0, weight=1)
@@ -119,21 +257,32 @@ class FloatingPointErrorAnalyzer(tk.Tk):
 
         fig = Figure(figsize=(7, 4), dpi=100)
         self.ax = fig.add_subplot(111)
+
+        # Create the error curves and axis decorations once; each run only swaps in new data
+        self._line, = self.ax.plot([], [], label="Naive summation")
+        self._kahan_line, = self.ax.plot([], [], label="Kahan summation")
+        self.ax.set_xlabel("Number of Additions")
+        self.ax.set_ylabel("Absolute Error")
+        self.ax.grid(True)
+        self.ax.ticklabel_format(style='sci', axis='y', scilimits=(0,0)) # Scientific notation for y-axis
         
         self.canvas = FigureCanvasTkAgg(fig, master=plot_frame)
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
         self.canvas.draw()
         
-    def run_analysis(self):
-        """Performs the calculation and updates the GUI."""
+    def _parse_inputs(self):
+        """
+        Reads and validates the inputs, returning them as `SimulationParams`, or None if any is invalid.
+        The cheap checks come first, so bad input is rejected before any exact arithmetic is done.
+        """
+        import numpy as np
+
         try:
             large_num_str = self.large_num_var.get()
             small_num_str = self.small_num_var.get()
             iterations = int(self.iterations_var.get())
-            
-            # Use Decimal for high-precision ground truth
-            large_num_dec = Decimal(large_num_str)
-            small_num_dec = Decimal(small_num_str)
+            if iterations < 0 or iterations > _MAX_ITERATIONS:
+                return None
             
             # Select the floating point precision for the simulation
             if self.precision_var.get() == "Single (32-bit)":
@@ -141,52 +290,199 @@ class FloatingPointErrorAnalyzer(tk.Tk):
             else:
                 dtype = np.float64
                 
-            # Convert inputs to the chosen numpy float type
-            large_num_float = dtype(large_num_str)
-            small_num_float = dtype(small_num_str)
+            # Convert inputs to the chosen numpy float type; both must be finite in that type
+            # (out-of-range values are rejected below, so NumPy need not warn about them)
+            with np.errstate(over="ignore", under="ignore"):
+                large_num_float = dtype(large_num_str)
+                small_num_float = dtype(small_num_str)
+            if not (np.isfinite(large_num_float) and np.isfinite(small_num_float)):
+                return None
+
+            # Use exact scaled integers for the ground truth: both numbers are multiplied by the same
+            # power of ten, so the expected value after i additions is (large + i * small) / scale,
+            # computed with integer arithmetic only
+            large_mantissa, large_digits = _parse_scaled(large_num_str)
+            small_mantissa, small_digits = _parse_scaled(small_num_str)
+        except (ValueError, TypeError, InvalidOperation):
+            return None
+
+        # A nonzero input that rounds to zero in the chosen precision is out of its range too
+        if (large_mantissa and not large_num_float) or (small_mantissa and not small_num_float):
+            return None
+
+        digits = max(large_digits, small_digits)
+        return SimulationParams(
+            large_num_scaled=large_mantissa * 10 ** (digits - large_digits),
+            small_num_scaled=small_mantissa * 10 ** (digits - small_digits),
+            scale=10 ** digits,
+            large_num_float=large_num_float,
+            small_num_float=small_num_float,
+            iterations=iterations,
+            dtype=dtype,
+            algorithm=self.sum_algo_var.get(),
+            show_kahan=self.show_kahan_var.get(),
+        )
 
-        except (ValueError, TypeError):
-            messagebox.showerror("Invalid Input", "Please enter valid numbers.")
+    def run_analysis(self):
+        """Reads the inputs and starts the calculation in the background."""
+        params = self._parse_inputs()
+        if params is None:
+            messagebox.showerror(
+                "Invalid Input",
+                "Please enter valid numbers: both must be within the range of the chosen precision, "
+                f"and the number of additions must be a whole number from 0 to {_MAX_ITERATIONS:,}."
+            )
             return
 
-        # 1. Calculate the "actual" result using an iterative loop (this is where errors accumulate)
-        actual_result = large_num_float
-        errors_over_time = []
-        iteration_steps = range(1, iterations + 1)
-        
-        for i in iteration_steps:
-            actual_result += small_num_float
-            # Calculate the error at this step for plotting
-            current_expected_dec = large_num_dec + (Decimal(i) * small_num_dec)
-            current_error = abs(Decimal(str(actual_result)) - current_expected_dec)
-            errors_over_time.append(current_error)
-
-        # 2. Calculate the "expected" result using high-precision Decimal
-        expected_result_dec = large_num_dec + (Decimal(iterations) * small_num_dec)
-
-        # 3. Calculate final errors
-        absolute_error = abs(Decimal(str(actual_result)) - expected_result_dec)
-        
-        if expected_result_dec != 0:
-            relative_error_percent = (absolute_error / abs(expected_result_dec)) * 100
+        # Identical inputs give identical results, so reuse those of a recent run if there is one
+        if params in self._cache:
+            self._cache.move_to_end(params)
+            self._update_ui(self._cache[params])
+            return
+
+        # Run the numeric work on a worker thread so the window stays responsive
+        self.run_button.config(state=tk.DISABLED)
+        worker = threading.Thread(
+            target=self._compute_and_post,
+            args=(params,),
+            daemon=True
+        )
+        worker.start()
+
+    def _compute_and_post(self, params):
+        """Runs `_compute` on the worker thread and hands the outcome back to the Tk main thread."""
+        try:
+            results = self._compute(params)
+        except Exception as exc:
+            # Whatever went wrong, the main thread has to hear about it, or the run button stays disabled
+            self._post_to_main(self._show_compute_error, exc)
+        else:
+            self._post_to_main(self._finish_run, params, results)
+
+    def _post_to_main(self, callback, *args):
+        """Schedules `callback(*args)` on the Tk main thread, unless the window has been closed meanwhile."""
+        try:
+            self.after(0, callback, *args)
+        except (RuntimeError, tk.TclError):
+            # The main loop has ended or the window is destroyed, so there is nothing left to update
+            pass
+
+    def _compute(self, params):
+        """Performs the calculation. Runs off the main thread, so it must not touch any widget."""
+        import numpy as np
+        import summation
+
+        large_num_scaled, small_num_scaled, scale = params.large_num_scaled, params.small_num_scaled, params.scale
+        large_num_float, small_num_float = params.large_num_float, params.small_num_float
+        iterations, dtype, algorithm = params.iterations, params.dtype, params.algorithm
+
+        # 1. Calculate the "actual" result by repeated addition with the chosen algorithm (this is where
+        # errors accumulate), recording the running sum only at the evenly spaced steps where the error is evaluated
+        sum_kernel = getattr(summation, _SUM_ALGORITHMS[algorithm])
+        # The steps are spaced with integer arithmetic, which float linspace is not exact enough for at
+        # large counts: they run from 1 to exactly `iterations` and are strictly increasing
+        n_samples = min(iterations, _ERROR_SAMPLES)
+        sample_idx = 1 + np.arange(n_samples, dtype=np.int64) * (iterations - 1) // max(n_samples - 1, 1)
+        actual_samples = np.empty(len(sample_idx), dtype=dtype)
+        actual_result = dtype(sum_kernel(large_num_float, small_num_float, iterations, sample_idx, actual_samples))
+
+        # Calculate the error at each sampled step, then keep only the points needed to draw the curve
+        errors_over_time = summation.sampled_errors(
+            sample_idx, actual_samples, large_num_scaled, small_num_scaled, scale
+        )
+        error_curve = _lttb_approx(sample_idx, errors_over_time, _PLOT_POINTS)
+
+        # Optionally repeat the additions with Kahan compensated summation for comparison
+        kahan_curve = None
+        if params.show_kahan and sum_kernel is not summation.kahan_sum:
+            kahan_samples = np.empty(len(sample_idx), dtype=dtype)
+            summation.kahan_sum(large_num_float, small_num_float, iterations, sample_idx, kahan_samples)
+            kahan_errors = summation.sampled_errors(
+                sample_idx, kahan_samples, large_num_scaled, small_num_scaled, scale
+            )
+            kahan_curve = _lttb_approx(sample_idx, kahan_errors, _PLOT_POINTS)
+
+        # 2. Calculate the exact "expected" result, as a (numerator, denominator) pair
+        expected_scaled = large_num_scaled + iterations * small_num_scaled
+        expected_result = (expected_scaled, scale)
+
+        # 3. Calculate final errors. The float is exactly p / q, so its distance from the expected value
+        # is |p * scale - expected_scaled * q| / (q * scale)
+        if not np.isfinite(actual_result):
+            # The sum overflowed (inf), or the Kahan compensation broke down on the overflow (nan); such
+            # a float has no exact ratio, so both errors are reported as that non-finite value
+            absolute_error = relative_error_percent = abs(float(actual_result))
         else:
-            relative_error_percent = Decimal(0)
+            p, q = float(actual_result).as_integer_ratio()
+            error_numerator = abs(p * scale - expected_scaled * q)
+            absolute_error = (error_numerator, q * scale)
+
+            if expected_scaled != 0:
+                relative_error_percent = (error_numerator * 100, q * abs(expected_scaled))
+            else:
+                relative_error_percent = (0, 1)
+
+        return {
+            "dtype": dtype,
+            "algorithm": algorithm,
+            "error_curve": error_curve,
+            "kahan_curve": kahan_curve,
+            "actual_result": actual_result,
+            "expected_result": expected_result,
+            "absolute_error": absolute_error,
+            "relative_error_percent": relative_error_percent,
+        }
+
+    def _finish_run(self, params, results):
+        """Remembers the results of a finished run and shows them."""
+        self._cache[params] = results
+        if len(self._cache) > _RESULT_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        self._update_ui(results)
+
+    def _show_compute_error(self, exc):
+        """Reports a failed calculation and re-enables the run button."""
+        self.run_button.config(state=tk.NORMAL)
+        messagebox.showerror("Analysis Failed", str(exc))
 
-        # 4. Update the result labels
-        self.expected_var.set(f"{expected_result_dec:,.15f}")
-        self.actual_var.set(f"{actual_result:,.15f}")
-        self.abs_error_var.set(f"{absolute_error:.15e}") # Scientific notation for error
-        self.rel_error_var.set(f"{relative_error_percent:.15f} %")
+    def _commit_results(self, expected, actual, absolute_error, relative_error):
+        """Sets the four result labels in one go."""
+        self.expected_var.set(expected)
+        self.actual_var.set(actual)
+        self.abs_error_var.set(absolute_error)
+        self.rel_error_var.set(relative_error)
+
+    def _update_ui(self, results):
+        """Shows the results of `_compute` in the labels and the plot."""
+        self.run_button.config(state=tk.NORMAL)
+
+        # 4. Update the result labels, all four together once Tk is idle
+        self.after_idle(
+            self._commit_results,
+            f"{_to_decimal(*results['expected_result']):,.15f}",
+            f"{results['actual_result']:,.15f}",
+            _format_exact(results["absolute_error"], ".15e"), # Scientific notation for error
+            f"{_format_exact(results['relative_error_percent'], '.15f')} %"
+        )
         
         # 5. Update the plot
-        self.ax.clear()
-        self.ax.plot(iteration_steps, errors_over_time)
-        self.ax.set_title(f"Accumulated Absolute Error ({dtype.__name__})")
-        self.ax.set_xlabel("Number of Additions")
-        self.ax.set_ylabel("Absolute Error")
-        self.ax.grid(True)
-        self.ax.ticklabel_format(style='sci', axis='y', scilimits=(0,0)) # Scientific notation for y-axis
-        self.canvas.draw()
+        steps, errors = results["error_curve"]
+        self._line.set_data(steps, errors)
+        self._line.set_label(results["algorithm"])
+        if results["kahan_curve"] is not None:
+            steps, errors = results["kahan_curve"]
+            self._kahan_line.set_data(steps, errors)
+            self.ax.legend(handles=[self._line, self._kahan_line])
+        else:
+            self._kahan_line.set_data([], [])
+            legend = self.ax.get_legend()
+            if legend is not None:
+                legend.remove()
+
+        self.ax.set_title(f"Accumulated Absolute Error ({results['dtype'].__name__})")
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
 
 
 if __name__ == "__main__":
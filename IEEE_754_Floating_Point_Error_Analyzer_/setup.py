@@ -0,0 +1,24 @@
+"""
+Builds the optional compiled summation kernel used when Numba is not installed:
+
+    python setup.py build_ext --inplace
+"""
+import sys
+
+from setuptools import Extension, setup
+from Cython.Build import cythonize
+
+# Keep strict IEEE semantics: fast-math would let the compiler reorder the additions and hide the
+# rounding error the analyzer is meant to show
+if sys.platform == "win32":
+    compile_args = ["/O2", "/fp:strict"]
+else:
+    compile_args = ["-O3", "-fno-fast-math"]
+
+setup(
+    name="floating-point-error-analyzer-kernels",
+    ext_modules=cythonize(
+        [Extension("_naive_sum", ["_naive_sum.pyx"], extra_compile_args=compile_args)],
+        language_level=3,
+    ),
+)
@@ -0,0 +1,223 @@
+"""
+Summation kernels and error evaluation for the floating-point error analyzer.
+
+Every kernel adds `small` to `large` n times in the float type of `out` and returns the final sum,
+writing the partial sum after sample_idx[k] additions to out[k]. The GUI imports this module on
+the first run, so NumPy and Numba are only loaded once they are needed.
+"""
+import math
+import numpy as np
+from functools import lru_cache
+
+# Numba is optional: it compiles the addition loops to machine code, otherwise NumPy is used
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Without Numba, the naive loop can still run compiled if the Cython kernel has been built
+# (`python setup.py build_ext --inplace` in this directory)
+try:
+    import _naive_sum
+except ImportError:
+    _naive_sum = None
+
+
+# Pairwise summation adds runs of up to this many values one after another instead of splitting further
+PAIRWISE_BLOCK = 8
+
+# 2**27 + 1, used by Dekker's algorithm to split a float64 into two 26-bit halves
+_SPLITTER = 134217729.0
+
+# Binary exponents the error evaluation keeps its operands below: _SPLITTER * a overflows once
+# |a| reaches about 2**996, and the expected values must stay clear of the float64 maximum of 2**1024
+_SPLIT_EXPONENT = 995
+_SUM_EXPONENT = 1020
+
+
+def naive_sum(large, small, n, sample_idx, out):
+    """
+    Adds `small` to `large` n times, one addition after another, and returns the final sum.
+    The partial sum after sample_idx[k] additions is written to out[k]; sample_idx must be increasing.
+    """
+    acc = large
+    k = 0
+    for i in range(1, n + 1):
+        acc += small
+        if k < len(sample_idx) and sample_idx[k] == i:
+            out[k] = acc
+            k += 1
+    return acc
+
+
+def naive_sum_numpy(large, small, n, sample_idx, out):
+    """Same as `naive_sum`, using a NumPy running sum seeded with `large`."""
+    # cumsum adds one element at a time, left to right, so every partial sum is rounded
+    # exactly as in the serial loop above
+    addends = np.full(n + 1, small, dtype=out.dtype)
+    addends[0] = large
+    running_sum = np.cumsum(addends, dtype=out.dtype)
+    out[:] = running_sum[sample_idx]
+    return running_sum[-1]
+
+
+def naive_sum_cython(large, small, n, sample_idx, out):
+    """Same as `naive_sum`, using the compiled kernel from `_naive_sum.pyx`."""
+    if out.dtype == np.float32:
+        return _naive_sum.naive_sum_f32(large, small, n, sample_idx, out)
+    return _naive_sum.naive_sum_f64(large, small, n, sample_idx, out)
+
+
+def kahan_sum(large, small, n, sample_idx, out):
+    """
+    Same as `naive_sum`, but uses Kahan compensated summation: the low-order bits lost by each
+    addition are carried in `c` and fed back into the next one, so the error stays O(eps) instead
+    of growing with n.
+    """
+    s = large
+    c = small - small  # zero of the same float type, so the loop never widens to float64
+    k = 0
+    for i in range(1, n + 1):
+        y = small - c
+        t = s + y
+        c = (t - s) - y
+        s = t
+        if k < len(sample_idx) and sample_idx[k] == i:
+            out[k] = s
+            k += 1
+    return s
+
+
+def pairwise_sum(large, small, n, sample_idx, out):
+    """
+    Same as `naive_sum`, but each partial sum adds up `large` followed by i copies of `small` by
+    plain recursive pairwise summation, similar to np.sum: the values are split in two halves, each
+    half is summed recursively and the two results are added, down to runs of PAIRWISE_BLOCK values
+    that are added one after another. The error then grows as O(eps * log n). It is not NumPy's own
+    implementation, so the results need not match np.sum bit for bit.
+    Because every value but the first is the same, the sum of each run length is computed only once.
+    """
+    zero = small - small
+
+    @lru_cache(maxsize=None)
+    def smalls(m):
+        # Pairwise sum of m copies of `small`
+        if m <= PAIRWISE_BLOCK:
+            acc = zero
+            for _ in range(m):
+                acc += small
+            return acc
+        half = m // 2
+        return smalls(half) + smalls(m - half)
+
+    @lru_cache(maxsize=None)
+    def total(m):
+        # Pairwise sum of `large` followed by m copies of `small`
+        if m < PAIRWISE_BLOCK:
+            acc = large
+            for _ in range(m):
+                acc += small
+            return acc
+        half = (m + 1) // 2
+        return total(half - 1) + smalls(m + 1 - half)
+
+    for k, i in enumerate(sample_idx):
+        out[k] = total(int(i))
+    return total(n)
+
+
+def kahan_sum_python(large, small, n, sample_idx, out, kernel=kahan_sum):
+    """
+    Same as `kahan_sum`, for when the loop has to run in the interpreter. Python ints and floats are
+    much cheaper to compare and add than NumPy scalars, so the step numbers are turned into a list
+    and float64 runs use Python floats (which are IEEE doubles); float32 runs keep NumPy scalars,
+    which round every operation to single precision.
+    """
+    if out.dtype == np.float64:
+        large, small = float(large), float(small)
+    return kernel(large, small, n, sample_idx.tolist(), out)
+
+
+if njit is not None:
+    # fastmath stays off: reassociating the additions would hide the very error we want to show
+    # (and would let the compiler optimise Kahan's compensation term away entirely)
+    # nogil lets the kernels run on the worker thread without blocking the Tk event loop
+    naive_sum = njit(cache=True, fastmath=False, nogil=True)(naive_sum)
+    kahan_sum = njit(cache=True, fastmath=False, nogil=True)(kahan_sum)
+elif _naive_sum is not None:
+    naive_sum = naive_sum_cython
+    kahan_sum = kahan_sum_python
+else:
+    naive_sum = naive_sum_numpy
+    kahan_sum = kahan_sum_python
+
+
+def _two_sum(a, b):
+    """Returns (s, e) with s = fl(a + b) and s + e = a + b exactly (Knuth's TwoSum)."""
+    s = a + b
+    b_virtual = s - a
+    return s, (a - (s - b_virtual)) + (b - b_virtual)
+
+
+def _split(a):
+    """Splits float64 values into two halves of at most 26 significant bits each (Dekker)."""
+    c = _SPLITTER * a
+    hi = c - (c - a)
+    return hi, a - hi
+
+
+def _two_prod(a, b):
+    """Returns (p, e) with p = fl(a * b) and p + e = a * b exactly (Dekker's TwoProduct)."""
+    p = a * b
+    a_hi, a_lo = _split(a)
+    b_hi, b_lo = _split(b)
+    return p, ((a_hi * b_hi - p) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo
+
+
+def _to_double_double(numerator, denominator):
+    """Returns the exact ratio of two integers as an unevaluated sum hi + lo of two floats."""
+    hi = numerator / denominator
+    p, q = hi.as_integer_ratio()
+    return hi, (numerator * q - p * denominator) / (denominator * q)
+
+
+def sampled_errors(sample_idx, actual_samples, large_scaled, small_scaled, scale):
+    """
+    Returns the absolute error of each sampled partial sum against (large + i * small), as a float64
+    array that can be handed to Matplotlib as is. `large_scaled` and `small_scaled` are the two inputs
+    multiplied by `scale` (a power of ten), i.e. given exactly.
+
+    The whole curve is computed with a few vectorized NumPy passes. A plain float64 expected value
+    would carry a rounding error as large as the float64 errors being measured, so it is kept as a
+    double-double (about 106 significant bits), built with error-free transformations. The result is
+    then accurate to around 1e-30 relative to the sum, far below anything visible in the plot; the
+    headline numbers are still computed exactly. Inputs near the top of the float64 range are first
+    scaled down by a power of two, which is exact, so that none of these steps can overflow.
+    """
+    large_hi, large_lo = _to_double_double(large_scaled, scale)
+    small_hi, small_lo = _to_double_double(small_scaled, scale)
+    steps = sample_idx.astype(np.float64)
+
+    # Number of binary places everything is shifted down by, and the errors shifted back up by
+    steps_exponent = math.frexp(steps[-1])[1] if len(steps) else 0
+    shift = max(
+        0,
+        math.frexp(large_hi)[1] - _SUM_EXPONENT,
+        math.frexp(small_hi)[1] + steps_exponent - _SUM_EXPONENT,
+        math.frexp(small_hi)[1] - _SPLIT_EXPONENT,
+    )
+    if shift:
+        large_hi, large_lo = math.ldexp(large_hi, -shift), math.ldexp(large_lo, -shift)
+        small_hi, small_lo = math.ldexp(small_hi, -shift), math.ldexp(small_lo, -shift)
+
+    # An overflowed or Kahan-broken partial sum is inf or nan, which simply carries through as its error
+    with np.errstate(over="ignore", invalid="ignore"):
+        # expected = large + i * small, carried as expected_hi + expected_lo
+        product_hi, product_lo = _two_prod(steps, small_hi)
+        product_lo += steps * small_lo
+        expected_hi, expected_lo = _two_sum(large_hi, product_hi)
+        expected_lo += large_lo + product_lo
+
+        # The computed sums are close to expected_hi, so this first subtraction is exact in most cases
+        actual = np.ldexp(actual_samples.astype(np.float64), -shift)
+        return np.ldexp(np.abs((actual - expected_hi) - expected_lo), shift)